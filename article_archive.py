@@ -0,0 +1,143 @@
+import gzip
+import io
+import json
+import os
+import zlib
+from datetime import datetime, timezone
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# アーカイブの保存先 (日付・実行ごとのセグメントファイル)
+ARCHIVE_DIR = os.path.join(os.path.dirname(__file__), 'data', 'archive')
+# この実行 (プロセス) が書き込むセグメントの識別子
+# 再開した実行は別プロセスなので、書きかけで壊れている可能性のある前回のセグメントには追記しない
+RUN_SEGMENT_ID = f"{datetime.now(timezone.utc):%H%M%S}_{os.getpid()}"
+# 圧縮形式: 'gzip' (デフォルト) または 'zstd' (zstandard がインストールされている場合のみ)
+ARCHIVE_COMPRESSION = os.environ.get('ARCHIVE_COMPRESSION', 'gzip').lower()
+
+# セグメント読み出し時に「途中で打ち切る」扱いにする例外
+_SEGMENT_READ_ERRORS = (EOFError, OSError, zlib.error, RuntimeError)
+if zstandard is not None:
+    _SEGMENT_READ_ERRORS += (zstandard.ZstdError,)
+
+SEGMENT_EXTENSIONS = {
+    'gzip': '.jsonl.gz',
+    'zstd': '.jsonl.zst',
+}
+
+def _resolve_compression():
+    """設定された圧縮形式を返す。zstd が使えない場合は gzip にフォールバックする"""
+    if ARCHIVE_COMPRESSION == 'zstd':
+        if zstandard is not None:
+            return 'zstd'
+        print("Warning: zstandard is not installed. Falling back to gzip for the article archive.")
+    return 'gzip'
+
+def segment_path(timestamp, compression=None):
+    """
+    タイムスタンプが属する、この実行のセグメントファイルのパスを返す
+    :param timestamp: datetimeオブジェクト (UTC)
+    :param compression: 'gzip' または 'zstd' (省略時は設定値)
+    """
+    compression = compression or _resolve_compression()
+    date_str = timestamp.astimezone(timezone.utc).strftime('%Y%m%d')
+    return os.path.join(ARCHIVE_DIR, f"articles_{date_str}_{RUN_SEGMENT_ID}{SEGMENT_EXTENSIONS[compression]}")
+
+def append_article(timestamp_utc, source_name, url, text, title=None, published=None):
+    """
+    抽出済みの記事本文をアーカイブに追記する (追記専用)
+    1記事ごとに独立した圧縮メンバー/フレームとして書き込み、ディスクへの書き込みを保証してから戻る。
+    書きかけのメンバーはそのセグメントの末尾にしか残らない (次の実行は別のセグメントに書く)。
+    :param timestamp_utc: 集計バケットのISOフォーマットのUTCタイムスタンプ (hourly_keyword_counts と同じ値)
+    :param source_name: RSSフィード名
+    :param url: 記事URL
+    :param text: 抽出済みの本文テキスト
+    :param title: 記事タイトル
+    :param published: RSSに記載された公開日時 (文字列のまま保存)
+    """
+    record = {
+        "timestamp": timestamp_utc,
+        "source": source_name,
+        "url": url,
+        "title": title,
+        "published": published,
+        "text": text,
+    }
+    data = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+    compression = _resolve_compression()
+    path = segment_path(datetime.fromisoformat(timestamp_utc), compression)
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    if compression == 'zstd':
+        data = zstandard.ZstdCompressor(level=10).compress(data)
+    else:
+        data = gzip.compress(data, compresslevel=6)
+    with open(path, 'ab') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _segment_date(filename):
+    """
+    セグメントファイル名 (articles_YYYYMMDD_<実行ID> または旧形式の articles_YYYYMMDD) から
+    日付を取り出す (形式が違えば None)
+    """
+    for compression, ext in SEGMENT_EXTENSIONS.items():
+        if filename.startswith('articles_') and filename.endswith(ext):
+            try:
+                date = datetime.strptime(filename[len('articles_'):-len(ext)].split('_', 1)[0], '%Y%m%d')
+            except ValueError:
+                return None, None
+            return date.date(), compression
+    return None, None
+
+def list_segments(start_date=None, end_date=None):
+    """
+    指定期間 (両端含む) のセグメントファイルを日付順に返す
+    :param start_date: dateオブジェクト (省略時は制限なし)
+    :param end_date: dateオブジェクト (省略時は制限なし)
+    :return: [(date, compression, path), ...]
+    """
+    segments = []
+    if not os.path.isdir(ARCHIVE_DIR):
+        return segments
+    for filename in os.listdir(ARCHIVE_DIR):
+        date, compression = _segment_date(filename)
+        if date is None:
+            continue
+        if start_date and date < start_date:
+            continue
+        if end_date and date > end_date:
+            continue
+        segments.append((date, compression, os.path.join(ARCHIVE_DIR, filename)))
+    segments.sort()
+    return segments
+
+def _open_segment(path, compression):
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {path}")
+        raw = open(path, 'rb')
+        reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(reader, encoding='utf-8')
+    return gzip.open(path, 'rt', encoding='utf-8')
+
+def iter_articles(start_date=None, end_date=None):
+    """
+    アーカイブから記事レコードを順に読み出す
+    末尾の書きかけのメンバーや壊れた行は警告を出してスキップする。
+    :param start_date: dateオブジェクト (省略時は制限なし)
+    :param end_date: dateオブジェクト (省略時は制限なし)
+    """
+    for _, compression, path in list_segments(start_date, end_date):
+        try:
+            with _open_segment(path, compression) as f:
+                for line_number, line in enumerate(f, 1):
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        print(f"Warning: Line {line_number} in {path} is not valid JSON. Skipping.")
+        except _SEGMENT_READ_ERRORS as e:
+            print(f"Warning: Stopped reading {path} early (truncated or unreadable): {e}")
@@ -0,0 +1,137 @@
+import codecs
+import os
+from html.parser import HTMLParser
+
+import requests
+
+# 1記事あたりに読み込む最大バイト数 (展開後)。超えた分は読まずに打ち切る
+MAX_ARTICLE_BYTES = int(os.environ.get('MAX_ARTICLE_BYTES', 2 * 1024 * 1024))
+STREAM_CHUNK_SIZE = 16 * 1024
+# '0' にするとストリーミングせず、従来どおりレスポンス全体を読み込む
+ARTICLE_STREAMING = os.environ.get('ARTICLE_STREAMING', '1') != '0'
+
+# 終了タグを持たない要素 (開いた要素のスタックに積まない)
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr'
+])
+
+def selector_matches(selector, tag, attrs):
+    """'tag'、'.class'、'tag[attr="value"]' 形式の簡単なCSSセレクタだけを判定する"""
+    if selector.startswith('.'):
+        return selector[1:] in (dict(attrs).get('class') or '').split()
+    if '[' in selector:
+        name, condition = selector.rstrip(']').split('[', 1)
+        attr, value = condition.split('=', 1)
+        return tag == name and dict(attrs).get(attr) == value.strip('"\'')
+    return tag == selector
+
+class ArticleBodyStreamParser(HTMLParser):
+    """
+    HTMLをチャンク単位で受け取り、stop_selector に一致する最初の要素が閉じた時点で
+    その要素のHTML断片 (fragment) を確定させる
+    """
+    def __init__(self, stop_selector):
+        super().__init__(convert_charrefs=True)
+        self.stop_selector = stop_selector
+        self.fragment = None
+        self._chunks = []
+        self._length = 0
+        self._line_starts = [0]
+        self._open_tags = []
+        self._match_depth = 0
+        self._fragment_start = None
+
+    def feed_chunk(self, text):
+        """デコード済みのテキストを追加する。本文コンテナが閉じたら True を返す"""
+        base = self._length
+        self._chunks.append(text)
+        self._length += len(text)
+        newline = text.find('\n')
+        while newline != -1:
+            self._line_starts.append(base + newline + 1)
+            newline = text.find('\n', newline + 1)
+        self.feed(text)
+        return self.fragment is not None
+
+    def get_html(self):
+        """これまでに受け取ったHTML全体"""
+        return ''.join(self._chunks)
+
+    def _offset(self):
+        """直前に処理したタグの先頭位置 (受け取ったHTML全体での文字オフセット)"""
+        lineno, column = self.getpos()
+        return self._line_starts[lineno - 1] + column
+
+    def handle_starttag(self, tag, attrs):
+        if self.fragment is not None or tag in VOID_ELEMENTS:
+            return
+        matched = selector_matches(self.stop_selector, tag, attrs)
+        if matched:
+            if self._match_depth == 0:
+                self._fragment_start = self._offset()
+            self._match_depth += 1
+        self._open_tags.append((tag, matched))
+
+    def handle_endtag(self, tag):
+        if self.fragment is not None:
+            return
+        # 閉じ忘れのタグがあっても、対応する開始タグまでスタックを戻す
+        for index in range(len(self._open_tags) - 1, -1, -1):
+            if self._open_tags[index][0] == tag:
+                break
+        else:
+            return
+        self._match_depth -= sum(1 for _, matched in self._open_tags[index:] if matched)
+        del self._open_tags[index:]
+        if self._fragment_start is not None and self._match_depth == 0:
+            html = self.get_html()
+            end = html.index('>', self._offset()) + 1
+            self.fragment = html[self._fragment_start:end]
+
+def download_article_html(url, headers, timeout=10, max_bytes=MAX_ARTICLE_BYTES, stop_selector=None):
+    """
+    記事ページのHTMLを取得する
+    ストリーミング時は max_bytes で読み込みを打ち切り、stop_selector に一致する要素が閉じた時点で
+    残りを読まずに終了する (その場合はその要素のHTML断片だけを返す)。
+    :param url: 記事URL
+    :param headers: リクエストヘッダー
+    :param timeout: タイムアウト秒数
+    :param max_bytes: 読み込む最大バイト数 (展開後)
+    :param stop_selector: 早期終了の目印にするセレクタ (None なら最後まで読む)
+    :return: (html, stats) stats は {"wire_bytes", "decoded_bytes", "stopped_early", "truncated"}
+    """
+    stats = {"wire_bytes": 0, "decoded_bytes": 0, "stopped_early": False, "truncated": False}
+    if not ARTICLE_STREAMING:
+        response = requests.get(url, timeout=timeout, headers=headers)
+        response.raise_for_status()
+        stats["decoded_bytes"] = len(response.content)
+        # .content を読み終えた後でも、展開前の転送量を返す
+        stats["wire_bytes"] = response.raw.tell()
+        return response.text, stats
+
+    with requests.get(url, timeout=timeout, headers=headers, stream=True) as response:
+        response.raise_for_status()
+        decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+        parser = ArticleBodyStreamParser(stop_selector) if stop_selector else None
+        text_parts = []
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            if stats["decoded_bytes"] + len(chunk) > max_bytes:
+                chunk = chunk[:max_bytes - stats["decoded_bytes"]]
+                stats["truncated"] = True
+            stats["decoded_bytes"] += len(chunk)
+            text = decoder.decode(chunk, final=stats["truncated"])
+            if parser:
+                if parser.feed_chunk(text):
+                    stats["stopped_early"] = True
+                    break
+            else:
+                text_parts.append(text)
+            if stats["truncated"]:
+                break
+        # 圧縮された転送量 (Content-Encoding の展開前)
+        stats["wire_bytes"] = response.raw.tell()
+
+    if parser:
+        return parser.fragment or parser.get_html(), stats
+    return ''.join(text_parts), stats
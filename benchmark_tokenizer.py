@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import time
+from collections import Counter
+
+from article_archive import iter_articles
+from keyword_tokenizer import LATIN_WORD_PATTERN, is_japanese_text
+from news_fetcher import (
+    extract_keywords, extract_keywords_mecab, EXCLUDED_WORDS, HOURLY_KEYWORD_COUNTS_LOG, TOKENIZER_OPTIONS
+)
+
+LATEST_TITLES_PATH = os.path.join(os.path.dirname(__file__), 'data', 'latest.txt')
+
+def load_sample_texts(limit):
+    """アーカイブの記事本文をサンプルとして使う。アーカイブが空なら latest.txt の見出しを使う"""
+    texts = [record['text'] for record in iter_articles() if record.get('text')][:limit]
+    if texts:
+        print(f"Using {len(texts)} archived article bodies as samples.")
+        return texts
+    if os.path.exists(LATEST_TITLES_PATH):
+        with open(LATEST_TITLES_PATH, 'r', encoding='utf-8') as f:
+            # 形式: 日付 | ソース | タイトル | URL
+            texts = [parts[2] for parts in (line.split(' | ') for line in f) if len(parts) >= 4][:limit]
+        print(f"Archive is empty. Using {len(texts)} headlines from {LATEST_TITLES_PATH} as samples.")
+    return texts
+
+def time_extractor(extractor, texts, repeat):
+    """1記事あたりの平均抽出時間 (ミリ秒) と抽出結果を返す"""
+    results = [extractor(text) for text in texts]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            extractor(text)
+    elapsed = time.perf_counter() - start
+    return elapsed * 1000 / max(1, len(texts) * repeat), results
+
+def report_equivalence(mecab_results, router_results, top_n):
+    exact_matches = 0
+    mecab_total = Counter()
+    router_total = Counter()
+    for mecab_keywords, router_keywords in zip(mecab_results, router_results):
+        mecab_counts = Counter(mecab_keywords)
+        router_counts = Counter(router_keywords)
+        if mecab_counts == router_counts:
+            exact_matches += 1
+        mecab_total.update(mecab_counts)
+        router_total.update(router_counts)
+
+    shared = sum((mecab_total & router_total).values())
+    print(f"Articles with identical keyword counts: {exact_matches}/{len(mecab_results)}")
+    print(f"Keyword occurrences shared with MeCab: {shared}/{sum(mecab_total.values())} "
+          f"(fast path produced {sum(router_total.values())})")
+    print(f"Top keywords only produced by MeCab: {(mecab_total - router_total).most_common(top_n)}")
+    print(f"Top keywords only produced by the fast path: {(router_total - mecab_total).most_common(top_n)}")
+
+def report_stored_vocabulary_pattern_match():
+    """
+    保存済みの hourly_keyword_counts (MeCab の出力) の語のうち、高速経路のトークン単位
+    (LATIN_WORD_PATTERN に完全一致し、除外されない語) に当てはまる割合
+    元の本文は保存されていないため、高速経路の出力との比較ではなく語彙の形の確認にとどまる。
+    """
+    if not os.path.exists(HOURLY_KEYWORD_COUNTS_LOG):
+        return
+    stored = Counter()
+    with open(HOURLY_KEYWORD_COUNTS_LOG, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                for source_counts in json.loads(line).get('sources', {}).values():
+                    stored.update(source_counts)
+            except json.JSONDecodeError:
+                continue
+    covered = sum(
+        count for keyword, count in stored.items()
+        if LATIN_WORD_PATTERN.fullmatch(keyword) and keyword.lower() not in EXCLUDED_WORDS
+    )
+    missed = [keyword for keyword in stored if not LATIN_WORD_PATTERN.fullmatch(keyword)]
+    print(f"Stored MeCab keyword occurrences shaped like fast-path tokens (vocabulary check only, "
+          f"not an output comparison): {covered}/{sum(stored.values())} "
+          f"({len(missed)} distinct keywords do not match the token pattern, e.g. {missed[:10]})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare MeCab and the English fast path on stored sample data.")
+    parser.add_argument('--limit', type=int, default=500, help="Maximum number of sample texts")
+    parser.add_argument('--repeat', type=int, default=3, help="Timing repetitions per sample")
+    parser.add_argument('--top', type=int, default=15, help="Number of differing keywords to show")
+    args = parser.parse_args()
+
+    print(f"Tokenizer options: {TOKENIZER_OPTIONS}")
+    texts = load_sample_texts(args.limit)
+    if not texts:
+        print("No sample texts found.")
+        return
+    japanese_count = sum(1 for text in texts if is_japanese_text(text))
+    print(f"Routing: {len(texts) - japanese_count} texts to the fast path, {japanese_count} to MeCab.")
+
+    mecab_ms, mecab_results = time_extractor(extract_keywords_mecab, texts, args.repeat)
+    router_ms, router_results = time_extractor(extract_keywords, texts, args.repeat)
+    print(f"MeCab only: {mecab_ms:.3f} ms/article")
+    print(f"Router:     {router_ms:.3f} ms/article ({mecab_ms / router_ms if router_ms else float('inf'):.1f}x faster)")
+
+    report_equivalence(mecab_results, router_results, args.top)
+    report_stored_vocabulary_pattern_match()
+
+if __name__ == "__main__":
+    main()
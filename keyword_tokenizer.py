@@ -0,0 +1,119 @@
+import json
+import os
+import re
+
+# 日本語 (ひらがな・カタカナ・漢字・半角カナ) とラテン文字の判定用
+JAPANESE_CHAR_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uff66-\uff9f]')
+# MeCab が英文を1語として扱う単位 (アクセント付きのラテン文字を含む英字の連続) に合わせる
+LATIN_WORD_PATTERN = re.compile(r'[A-Za-z\u00c0-\u00d6\u00d8-\u00f6\u00f8-\u024f]+')
+
+# 言語判定に使う先頭の文字数と、MeCab に回す日本語文字の割合のしきい値
+SCRIPT_SAMPLE_LENGTH = 2000
+JAPANESE_RATIO_THRESHOLD = 0.05
+
+STOPWORD_SETS = {
+    "english": frozenset("""
+        a about above after again against all am an and any are as at be because been before being below
+        between both but by can could did do does doing down during each few for from further had has have
+        having he her here hers herself him himself his how if in into is it its itself just me more most my
+        myself no nor not now of off on once only or other our ours ourselves out over own same she should so
+        some such than that the their theirs them themselves then there these they this those through to too
+        under until up very was we were what when where which while who whom why will with would you your
+        yours yourself yourselves also said says
+    """.split()),
+    "english_news": frozenset("""
+        listen article views minutes read news reading share subscribe newsletter advertisement
+        according reported report week today yesterday tuesday wednesday thursday friday saturday sunday monday
+    """.split()),
+}
+
+# 語尾が s でも複数形ではない (または語尾を落とすと別の語になる) 語
+LEMMA_EXCEPTIONS = frozenset("""
+    news series species does goes always perhaps whereas sometimes nevertheless besides
+    movies cookies
+""".split())
+# 規則では正しく戻せない複数形
+LEMMA_OVERRIDES = {
+    "buses": "bus",
+    "gases": "gas",
+    "biases": "bias",
+    "statuses": "status",
+    "analyses": "analysis",
+    "crises": "crisis",
+}
+
+DEFAULT_TOKENIZER_OPTIONS = {
+    "english_fast_path": True,
+    "lemmatize": False,
+    "stopword_sets": [],
+}
+
+def load_tokenizer_options(filepath):
+    """
+    keywords.json の "tokenizer" 設定を読み込む (未設定の項目はデフォルト値)
+    :return: {"english_fast_path": bool, "lemmatize": bool, "stopword_sets": [name, ...]}
+    """
+    options = dict(DEFAULT_TOKENIZER_OPTIONS)
+    if os.path.exists(filepath):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            options.update(json.load(f).get("tokenizer", {}))
+    unknown_sets = [name for name in options["stopword_sets"] if name not in STOPWORD_SETS]
+    if unknown_sets:
+        print(f"Warning: Unknown stopword sets {unknown_sets} in {filepath}. Ignoring them.")
+    return options
+
+def build_stopwords(set_names):
+    """名前で指定されたストップワード集合をまとめる (小文字)"""
+    stopwords = set()
+    for name in set_names:
+        stopwords.update(STOPWORD_SETS.get(name, ()))
+    return frozenset(stopwords)
+
+def is_japanese_text(text):
+    """先頭部分に含まれる日本語文字の割合で、MeCab に回すべきテキストかを判定する"""
+    sample = text[:SCRIPT_SAMPLE_LENGTH]
+    letters = sum(1 for char in sample if char.isalpha())
+    if not letters:
+        return False
+    japanese_chars = len(JAPANESE_CHAR_PATTERN.findall(sample))
+    return japanese_chars / letters >= JAPANESE_RATIO_THRESHOLD
+
+def lemmatize_english(word):
+    """
+    複数形などの語尾だけを落とす簡易的な見出し語化
+    大文字で始まる語 (固有名詞・銘柄名など) は変えない。ただし "ETFs" のような大文字略語の複数形は戻す。
+    """
+    if len(word) > 2 and word.endswith('s') and word[:-1].isupper():
+        return word[:-1]
+    if word[0].isupper():
+        return word
+    if word in LEMMA_EXCEPTIONS:
+        return word
+    if word in LEMMA_OVERRIDES:
+        return LEMMA_OVERRIDES[word]
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('sses', 'shes', 'ches', 'xes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is', 'as', 'os')):
+        return word[:-1]
+    return word
+
+def extract_latin_keywords(text, exclude_keywords, lemmatize=False):
+    """
+    ラテン文字のテキストを正規表現で分割してキーワードを返す (MeCab を使わない高速経路)
+    :param exclude_keywords: 除外する小文字のキーワード集合 (ストップワードを含む)
+    :param lemmatize: True の場合は lemmatize_english を適用する (元の語と見出し語の両方で除外判定する)
+    """
+    keywords = []
+    for match in LATIN_WORD_PATTERN.finditer(text):
+        word = match.group()
+        if word.lower() in exclude_keywords:
+            continue
+        if lemmatize:
+            word = lemmatize_english(word)
+            if word.lower() in exclude_keywords:
+                continue
+        if len(word) > 1:
+            keywords.append(word)
+    return keywords
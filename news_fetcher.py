@@ -7,6 +7,9 @@ import os
 import re
 import MeCab
 from collections import Counter
+from article_archive import append_article
+from article_downloader import download_article_html
+from keyword_tokenizer import load_tokenizer_options, build_stopwords, is_japanese_text, extract_latin_keywords
 
 # 設定
 RSS_FEEDS = {
@@ -24,10 +27,21 @@ HEADERS = {
 }
 # ★★★ ここまで ★★★
 
+# 本文を探すセレクタ (優先順)。先頭のセレクタの要素が閉じた時点でダウンロードを打ち切る
+ARTICLE_BODY_SELECTORS = [
+    'article', '.entry-content', '.post-content', '.article-body',
+    '.story-content', '.main-content', '.news-text', '.article_body',
+    '.content__body', '.zn-body__paragraph', 'div[itemprop="articleBody"]'
+]
+
 # ファイルパス
 PROCESSED_ARTICLES_LOG = os.path.join(os.path.dirname(__file__), 'data', 'processed_articles.json')
 HOURLY_KEYWORD_COUNTS_LOG = os.path.join(os.path.dirname(__file__), 'data', 'hourly_keyword_counts.jsonl')
+# 実行途中のチェックポイント (正常終了時に削除される)
+FETCH_JOURNAL_PATH = os.path.join(os.path.dirname(__file__), 'data', 'fetch_journal.jsonl')
 CONFIG_KEYWORDS_PATH = os.path.join(os.path.dirname(__file__), 'config', 'keywords.json')
+# hourly_keyword_counts.jsonl に残す時間数 (毎回の実行の最初に古いエントリを削除する)
+HOURLY_LOG_RETENTION_HOURS = 25
 
 # 除外キーワードをロード
 def load_exclude_keywords(filepath):
@@ -38,6 +52,9 @@ def load_exclude_keywords(filepath):
     return []
 
 EXCLUDE_KEYWORDS = load_exclude_keywords(CONFIG_KEYWORDS_PATH)
+TOKENIZER_OPTIONS = load_tokenizer_options(CONFIG_KEYWORDS_PATH)
+# 除外キーワードとストップワードをまとめた集合 (どちらの経路でも同じ除外ルールを使う)
+EXCLUDED_WORDS = frozenset(EXCLUDE_KEYWORDS) | build_stopwords(TOKENIZER_OPTIONS["stopword_sets"])
 
 # 形態素解析器の初期化 (MeCab)
 try:
@@ -47,16 +64,22 @@ except RuntimeError as e:
     print("MeCab Error Details:", e)
     raise
 
-def extract_keywords(text):
+def extract_keywords_mecab(text):
     node = tagger.parseToNode(text)
     keywords = []
     while node:
         if node.feature.startswith('名詞') or node.feature.startswith('動詞,自立') or node.feature.startswith('形容詞,自立'):
-            if node.surface.lower() not in EXCLUDE_KEYWORDS and len(node.surface) > 1:
+            if node.surface.lower() not in EXCLUDED_WORDS and len(node.surface) > 1:
                 keywords.append(node.surface)
         node = node.next
     return keywords
 
+def extract_keywords(text):
+    """日本語のテキストは MeCab、それ以外 (英文) は正規表現の高速経路でキーワードを抽出する"""
+    if TOKENIZER_OPTIONS["english_fast_path"] and not is_japanese_text(text):
+        return extract_latin_keywords(text, EXCLUDED_WORDS, lemmatize=TOKENIZER_OPTIONS["lemmatize"])
+    return extract_keywords_mecab(text)
+
 def load_processed_articles():
     if os.path.exists(PROCESSED_ARTICLES_LOG):
         with open(PROCESSED_ARTICLES_LOG, 'r', encoding='utf-8') as f:
@@ -68,8 +91,77 @@ def load_processed_articles():
 
 def save_processed_articles(urls):
     os.makedirs(os.path.dirname(PROCESSED_ARTICLES_LOG), exist_ok=True)
-    with open(PROCESSED_ARTICLES_LOG, 'w', encoding='utf-8') as f:
+    temp_path = PROCESSED_ARTICLES_LOG + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
         json.dump(urls, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, PROCESSED_ARTICLES_LOG)
+
+def append_journal_record(record):
+    """チェックポイントを1行追記し、ディスクへの書き込みを保証する"""
+    with open(FETCH_JOURNAL_PATH, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+def load_fetch_journal():
+    """
+    中断された実行のジャーナルを読み込む
+    :return: (実行開始時のタイムスタンプ, 処理済み記事レコードのリスト)。ジャーナルがなければ (None, [])
+    """
+    if not os.path.exists(FETCH_JOURNAL_PATH):
+        return None, []
+    run_timestamp = None
+    article_records = []
+    with open(FETCH_JOURNAL_PATH, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # クラッシュ時の書きかけの行
+                print(f"Warning: Skipping incomplete line {line_number} in {FETCH_JOURNAL_PATH}.")
+                continue
+            if record.get('type') == 'run':
+                run_timestamp = record.get('timestamp')
+            elif record.get('type') == 'article' and record.get('url'):
+                article_records.append(record)
+    if run_timestamp is None:
+        print(f"Warning: {FETCH_JOURNAL_PATH} has no run header. Ignoring it.")
+        return None, []
+    return run_timestamp, article_records
+
+def start_fetch_journal(run_timestamp, article_records):
+    """
+    ジャーナルを書き直して新しい実行 (または再開) を開始する
+    書きかけの行を取り除くため、一時ファイルに書いてから置き換える。
+    """
+    os.makedirs(os.path.dirname(FETCH_JOURNAL_PATH), exist_ok=True)
+    temp_path = FETCH_JOURNAL_PATH + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"type": "run", "timestamp": run_timestamp}) + '\n')
+        for record in article_records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, FETCH_JOURNAL_PATH)
+
+def clear_fetch_journal():
+    if os.path.exists(FETCH_JOURNAL_PATH):
+        os.remove(FETCH_JOURNAL_PATH)
+
+def hourly_entry_logged(timestamp_utc):
+    """指定タイムスタンプのエントリが hourly_keyword_counts.jsonl に既に書かれているか"""
+    if not os.path.exists(HOURLY_KEYWORD_COUNTS_LOG):
+        return False
+    with open(HOURLY_KEYWORD_COUNTS_LOG, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                if json.loads(line).get('timestamp') == timestamp_utc:
+                    return True
+            except json.JSONDecodeError:
+                continue
+    return False
 
 def clean_hourly_keyword_counts_log(max_age_hours=24):
     print(f"Cleaning {HOURLY_KEYWORD_COUNTS_LOG} for entries older than {max_age_hours} hours.")
@@ -104,30 +196,53 @@ def fetch_and_log_keywords():
     print(f"Fetching news at {datetime.now(timezone.utc)}...")
     processed_urls = load_processed_articles()
     new_processed_urls = list(processed_urls)
-    current_hourly_counts = {"timestamp": datetime.now(timezone.utc).isoformat(), "sources": {}}
-    new_keywords_detected = False
+    run_timestamp, journal_records = load_fetch_journal()
+    resumed_counts = {}
+    if run_timestamp:
+        known_urls = set(processed_urls)
+        for record in journal_records:
+            if record['url'] not in known_urls:
+                known_urls.add(record['url'])
+                processed_urls.append(record['url'])
+                new_processed_urls.append(record['url'])
+        if hourly_entry_logged(run_timestamp):
+            # hourly エントリの書き込み後に中断していた。その実行を完了させてから新しい実行を始める
+            print(f"Interrupted run from {run_timestamp} was already logged. Finishing it before starting a new run.")
+            save_processed_articles(new_processed_urls)
+            clear_fetch_journal()
+            run_timestamp, journal_records = None, []
+        else:
+            # 前回の中断地点から再開し、同じ時間バケットに集計を合流させる
+            print(f"Resuming interrupted run from {run_timestamp} ({len(journal_records)} articles already processed).")
+            for record in journal_records:
+                if record.get('keywords'):
+                    resumed_counts.setdefault(record.get('source'), Counter()).update(record['keywords'])
+    if not run_timestamp:
+        run_timestamp = datetime.now(timezone.utc).isoformat()
+    start_fetch_journal(run_timestamp, journal_records)
+    current_hourly_counts = {"timestamp": run_timestamp, "sources": {}}
+    new_keywords_detected = bool(resumed_counts)
+    run_download_stats = Counter()
 
     for source_name, rss_url in RSS_FEEDS.items():
         print(f"Processing feed: {source_name} ({rss_url})")
         try:
             feed = feedparser.parse(rss_url)
-            source_keyword_counts = Counter()
+            source_keyword_counts = resumed_counts.pop(source_name, Counter())
             for entry in feed.entries:
                 link = entry.link
                 if link not in processed_urls:
                     try:
                         print(f"Fetching article: {link}")
                         # ★★★ User-Agentヘッダーを使ってリクエスト ★★★
-                        response = requests.get(link, timeout=10, headers=HEADERS)
-                        response.raise_for_status()
-                        soup = BeautifulSoup(response.text, 'html.parser')
+                        html, download_stats = download_article_html(
+                            link, HEADERS, timeout=10, stop_selector=ARTICLE_BODY_SELECTORS[0])
+                        run_download_stats.update(download_stats)
+                        run_download_stats["articles"] += 1
+                        soup = BeautifulSoup(html, 'html.parser')
                         text_content = ""
-                        selectors = [
-                            'article', '.entry-content', '.post-content', '.article-body',
-                            '.story-content', '.main-content', '.news-text', '.article_body',
-                            '.content__body', '.zn-body__paragraph', 'div[itemprop="articleBody"]'
-                        ]
-                        for selector in selectors:
+                        article_keyword_counts = Counter()
+                        for selector in ARTICLE_BODY_SELECTORS:
                             body_div = soup.select_one(selector)
                             if body_div:
                                 text_content = body_div.get_text(separator=' ', strip=True)
@@ -137,15 +252,25 @@ def fetch_and_log_keywords():
                             text_content = BeautifulSoup(text_content, 'html.parser').get_text(separator=' ', strip=True)
 
                         if text_content:
+                            # 抽出ロジック変更後に再集計できるよう、本文をアーカイブに残す
+                            append_article(current_hourly_counts["timestamp"], source_name, link, text_content,
+                                           title=entry.get('title'), published=entry.get('published'))
                             print(f"Extracting keywords from: {link}")
                             keywords = extract_keywords(text_content)
                             if keywords:
                                 print(f"Detected keywords: {keywords[:5]}...")
-                                source_keyword_counts.update(keywords)
+                                article_keyword_counts.update(keywords)
+                                source_keyword_counts.update(article_keyword_counts)
                                 new_keywords_detected = True
                         else:
                             print(f"No text content found for: {link}")
                         new_processed_urls.append(link)
+                        append_journal_record({
+                            "type": "article",
+                            "source": source_name,
+                            "url": link,
+                            "keywords": dict(article_keyword_counts)
+                        })
                     except requests.exceptions.RequestException as e:
                         print(f"Error fetching article {link}: {e}")
                     except Exception as e:
@@ -155,6 +280,15 @@ def fetch_and_log_keywords():
         except Exception as e:
             print(f"Warning: Could not parse feed {rss_url} - {e}")
 
+    print(f"Downloaded {run_download_stats['articles']} articles: "
+          f"{run_download_stats['wire_bytes']} bytes over the wire, {run_download_stats['decoded_bytes']} bytes decoded "
+          f"({run_download_stats['stopped_early']} stopped early, {run_download_stats['truncated']} hit the size cap).")
+
+    # 今回処理できなかったフィードの再開分も失わないようにする
+    for source_name, source_keyword_counts in resumed_counts.items():
+        if source_keyword_counts:
+            current_hourly_counts["sources"][source_name] = dict(source_keyword_counts)
+
     if new_keywords_detected:
         os.makedirs(os.path.dirname(HOURLY_KEYWORD_COUNTS_LOG), exist_ok=True)
         with open(HOURLY_KEYWORD_COUNTS_LOG, 'a', encoding='utf-8') as f:
@@ -165,6 +299,7 @@ def fetch_and_log_keywords():
         print("No new keywords detected in this run.")
     save_processed_articles(new_processed_urls)
     print("Updated processed_articles.json.")
+    clear_fetch_journal()
 
 if __name__ == "__main__":
     data_dir = os.path.join(os.path.dirname(__file__), 'data')
@@ -175,5 +310,5 @@ if __name__ == "__main__":
         print(f"{CONFIG_KEYWORDS_PATH} not found. Creating a dummy file.")
         with open(CONFIG_KEYWORDS_PATH, 'w', encoding='utf-8') as f_cfg:
             json.dump({"exclude_keywords": ["example_exclude_word"]}, f_cfg, indent=4)
-    clean_hourly_keyword_counts_log(max_age_hours=25)
+    clean_hourly_keyword_counts_log(max_age_hours=HOURLY_LOG_RETENTION_HOURS)
     fetch_and_log_keywords()
@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time, timedelta, timezone
+
+from article_archive import iter_articles, list_segments
+from news_fetcher import extract_keywords, HOURLY_KEYWORD_COUNTS_LOG, HOURLY_LOG_RETENTION_HOURS
+from summarize import aggregate_trends, calculate_time_ranges, save_daily_trends_to_db
+
+def parse_date(value):
+    """YYYY-MM-DD 形式の文字列を date オブジェクトに変換する"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid date '{value}'. Expected YYYY-MM-DD.")
+
+def day_start(date):
+    return datetime.combine(date, time.min, tzinfo=timezone.utc)
+
+def _extract_article_keywords(text):
+    """ワーカープロセスで1記事分のキーワードを数える"""
+    return Counter(extract_keywords(text))
+
+def load_archived_articles(since, until):
+    """
+    アーカイブから [since, until) の記事を読み出す。同じURLは最初のレコードだけを使う
+    (クラッシュ後の再開で同じ記事が二重に追記されている場合がある)
+    :param since: datetimeオブジェクト (UTC)
+    :param until: datetimeオブジェクト (UTC)
+    """
+    articles = []
+    seen_urls = set()
+    for record in iter_articles(since.date(), (until - timedelta(microseconds=1)).date()):
+        try:
+            record_timestamp = datetime.fromisoformat(record['timestamp'])
+        except (KeyError, TypeError, ValueError):
+            print(f"Warning: Skipping archived record without a valid 'timestamp': {record.get('url')}")
+            continue
+        if not (since <= record_timestamp < until):
+            continue
+        if not record.get('text') or record.get('url') in seen_urls:
+            continue
+        seen_urls.add(record.get('url'))
+        articles.append(record)
+    print(f"Loaded {len(articles)} archived articles from {since.isoformat()} to {until.isoformat()}.")
+    return articles
+
+def rebuild_hourly_counts(articles, workers=None):
+    """
+    記事をプロセスプールでキーワード抽出し、hourly_keyword_counts と同じ形式のエントリを作る
+    :param articles: load_archived_articles の戻り値
+    :param workers: ワーカープロセス数 (省略時は CPU 数)
+    :return: タイムスタンプ順の [{"timestamp": ..., "sources": {...}}, ...]
+    """
+    buckets = {}
+    if articles:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(articles) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_extract_article_keywords, [a['text'] for a in articles], chunksize=chunksize)
+            for article, counts in zip(articles, results):
+                if counts:
+                    sources = buckets.setdefault(article['timestamp'], {})
+                    sources.setdefault(article['source'], Counter()).update(counts)
+
+    entries = []
+    for timestamp in sorted(buckets, key=datetime.fromisoformat):
+        entries.append({
+            "timestamp": timestamp,
+            "sources": {source: dict(counts) for source, counts in buckets[timestamp].items()}
+        })
+    print(f"Rebuilt {len(entries)} hourly entries from {len(articles)} articles.")
+    return entries
+
+def rewrite_hourly_keyword_counts_log(entries, archived_timestamps, since, until):
+    """
+    hourly_keyword_counts.jsonl の [since, until) のうち、アーカイブに記事があるバケットだけを
+    再計算結果で置き換える。アーカイブのないバケットと範囲外のエントリはそのまま残す。
+    since >= until の場合はファイルを書き換えず、既存エントリの読み込みだけを行う。
+    :param archived_timestamps: アーカイブに記事があるバケットのタイムスタンプ (datetime) の集合
+    :return: アーカイブで再計算されなかった既存エントリのリスト
+    """
+    retained_lines = []
+    unarchived_entries = []
+    if os.path.exists(HOURLY_KEYWORD_COUNTS_LOG):
+        with open(HOURLY_KEYWORD_COUNTS_LOG, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    entry_timestamp = datetime.fromisoformat(entry['timestamp'])
+                except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                    print(f"Warning: Skipping malformed line in {HOURLY_KEYWORD_COUNTS_LOG}: {line.strip()}")
+                    continue
+                archived = entry_timestamp in archived_timestamps
+                if not archived:
+                    unarchived_entries.append(entry)
+                if not (archived and since <= entry_timestamp < until):
+                    retained_lines.append((entry_timestamp, line if line.endswith('\n') else line + '\n'))
+
+    if since >= until:
+        print(f"No rebuilt buckets fall within the {HOURLY_LOG_RETENTION_HOURS}h retention of "
+              f"{HOURLY_KEYWORD_COUNTS_LOG}. Leaving it unchanged.")
+        return unarchived_entries
+
+    new_lines = [
+        (datetime.fromisoformat(entry['timestamp']), json.dumps(entry, ensure_ascii=False) + '\n')
+        for entry in entries
+        if since <= datetime.fromisoformat(entry['timestamp']) < until
+    ]
+    all_lines = sorted(retained_lines + new_lines, key=lambda item: item[0])
+
+    os.makedirs(os.path.dirname(HOURLY_KEYWORD_COUNTS_LOG), exist_ok=True)
+    temp_log_path = HOURLY_KEYWORD_COUNTS_LOG + ".tmp"
+    with open(temp_log_path, 'w', encoding='utf-8') as f_tmp:
+        for _, line in all_lines:
+            f_tmp.write(line)
+    os.replace(temp_log_path, HOURLY_KEYWORD_COUNTS_LOG)
+    print(f"Rewrote {HOURLY_KEYWORD_COUNTS_LOG}: {len(new_lines)} rebuilt entries, {len(retained_lines)} retained.")
+    return unarchived_entries
+
+def oldest_archive_start():
+    """最も古いアーカイブセグメントの日の 00:00 UTC (アーカイブがなければ None)"""
+    segments = list_segments()
+    return day_start(segments[0][0]) if segments else None
+
+def rebuild_daily_trends(entries, start_date, end_date):
+    """
+    start_date から end_date まで (両端含む) の各日について daily_trends を作り直す
+    summarize.py の定期実行 (00:00 UTC) と同じく、各日の 00:00 UTC 時点までの期間を集計する。
+    ただし定期実行は直近 HOURLY_LOG_RETENTION_HOURS 時間分しか残っていない hourly_keyword_counts.jsonl
+    から集計するため、1m/3m の行は実質直近約1日分になる。再計算した 1m/3m の行はアーカイブにある
+    30日/90日分すべてを集計するので、前後の定期実行の行とは値の規模が一致しない。
+    """
+    parsed_entries = [(datetime.fromisoformat(entry['timestamp']), entry) for entry in entries]
+    date = start_date
+    while date <= end_date:
+        current_time = day_start(date)
+        print(f"Rebuilding daily trends for {date.isoformat()}...")
+        hourly_counts = [entry for entry_timestamp, entry in parsed_entries if entry_timestamp <= current_time]
+        trends = aggregate_trends(hourly_counts, calculate_time_ranges(current_time))
+        save_daily_trends_to_db(trends, current_time)
+        date += timedelta(days=1)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild hourly keyword counts and daily trends from the article archive.",
+        epilog=f"hourly_keyword_counts.jsonl only keeps the last {HOURLY_LOG_RETENTION_HOURS} hours "
+               "(older entries are pruned on every fetch), so only rebuilt buckets within that window are "
+               "written to it. Rebuilt 1m/3m daily_trends rows aggregate the full 30/90 days of archived "
+               "articles, while rows written by the scheduled summarize.py only see the hourly log's "
+               f"last {HOURLY_LOG_RETENTION_HOURS} hours, so the two are not directly comparable.")
+    parser.add_argument('--start', required=True, type=parse_date, help="First date to rebuild (YYYY-MM-DD, UTC)")
+    parser.add_argument('--end', required=True, type=parse_date, help="Last date to rebuild (YYYY-MM-DD, UTC, inclusive)")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument('--skip-db', action='store_true', help="Only rewrite hourly_keyword_counts.jsonl")
+    parser.add_argument('--force', action='store_true',
+                        help="Rebuild daily trends even if their windows start before the oldest archive segment")
+    args = parser.parse_args()
+    if args.end < args.start:
+        parser.error("--end must not be earlier than --start")
+
+    since = day_start(args.start)
+    until = day_start(args.end + timedelta(days=1))
+    # daily_trends の最長期間 (3m) を計算できるよう、開始日より前の記事も読み込む
+    lookback_since = min(calculate_time_ranges(since).values()) if not args.skip_db else since
+    if not args.skip_db and not args.force:
+        # アーカイブが集計期間を覆っていない場合、既存の daily_trends を部分的なデータで上書きしない
+        archive_start = oldest_archive_start()
+        if archive_start is None or lookback_since < archive_start:
+            parser.error(f"Daily trends for {args.start.isoformat()} need archived articles since "
+                         f"{lookback_since.date().isoformat()}, but the archive starts at "
+                         f"{archive_start.date().isoformat() if archive_start else 'nothing'}. "
+                         "Use --skip-db to rebuild hourly counts only, or --force to overwrite anyway.")
+
+    articles = load_archived_articles(lookback_since, until)
+    entries = rebuild_hourly_counts(articles, args.workers)
+    archived_timestamps = {datetime.fromisoformat(article['timestamp']) for article in articles}
+    # 次回の fetch で削除されるバケットは hourly_keyword_counts.jsonl に書き込まない
+    retention_since = datetime.now(timezone.utc) - timedelta(hours=HOURLY_LOG_RETENTION_HOURS)
+    unarchived_entries = rewrite_hourly_keyword_counts_log(
+        entries, archived_timestamps, max(since, retention_since), until)
+    if not args.skip_db:
+        rebuild_daily_trends(entries + unarchived_entries, args.start, args.end)
+    print("Reprocessing finished.")
+
+if __name__ == "__main__":
+    main()